@@ -1,40 +1,208 @@
 #!/usr/bin/env python3
 """
 FastAPI Server for Website Testing Chatbot Interface
-Integrates Stagehand crawler functionality with REST API endpoints.
+Integrates the Playwright crawler with REST API endpoints.
 """
 
 import os
 import asyncio
-import subprocess
+import hashlib
 import json
-import requests
-from typing import Dict, Any, List
-from fastapi import FastAPI, HTTPException
+import logging
+import logging.handlers
+import re
+import time
+from collections import OrderedDict, defaultdict
+from queue import SimpleQueue
+from types import MappingProxyType
+from contextlib import asynccontextmanager
+from operator import itemgetter
+from typing import Dict, Any, List, Optional
+import aiosqlite
+import orjson
+import httpx
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, ConfigDict, ValidationError
 import uvicorn
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
 from anthropic import AsyncAnthropic
+from playwright.async_api import async_playwright
+
+import crawler
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 GITHUB_REPO = os.getenv("GITHUB_REPO")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 
-app = FastAPI(title="Website Testing API", version="1.0.0")
+# Read-only so the shared copy can't be mutated by a request
+GITHUB_HEADERS = MappingProxyType({
+    "Authorization": f"Bearer {GITHUB_TOKEN}",
+    "Accept": "application/vnd.github.v3+json",
+    "X-Github-Api-Version": "2022-11-28"
+})
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+LLM_CACHE_PATH = os.path.join(BACKEND_DIR, ".llm_cache.db")
+LLM_CACHE_TTL = 24 * 60 * 60  # Cached LLM replies expire after a day
+ISSUE_BATCH_POLL_INTERVAL = 60  # Seconds between OpenAI batch status checks
+ISSUE_BATCH_MAX_ATTEMPTS = 5  # Filing attempts before a finished batch's issue is dropped
+# Opt-in: generate issues through the OpenAI Batch API (cheaper, but filed up to 24h later)
+DEFER_GITHUB_ISSUES = os.getenv("DEFER_GITHUB_ISSUES", "0") == "1"
+CHAT_CACHE_TTL = 300  # Seconds a finished analysis is reused for the same URL and message
+CHAT_CACHE_SIZE = 1024
+
+SUMMARY_SYSTEM = """You are a helpful assistant that creates concise, accurate summaries. Be brief but informative.
+
+Please provide a concise summary of the following message. The summary should be:
+- About 3-4 sentences - concise but descriptive and informative
+- Capture the main intent and key details
+- Maintain the original tone and context"""
+
+ISSUE_MODEL = "gpt-4.1"
+ISSUE_INSTRUCTIONS = """You are a QA engineer creating GitHub issues for website testing results. Be concise, professional, and actionable.
+
+The user message is a JSON object with the tested website's url, the total issueCount, and up to 10 of the issues found.
+
+Please create:
+1. A concise, descriptive title (max 100 characters)
+2. A detailed body with summary, categorized issues, and recommendations
+3. Appropriate GitHub labels (2-4 labels)
+
+The body should include:
+- Summary of testing
+- Categorized issues (Error Pages, Broken Links, etc.)
+- Severity assessment
+- Recommendations for fixing
+- Technical details for developers
+
+Use markdown formatting in the body."""
+ISSUE_TEMPERATURE = 0.3
+
+# Bug types listed in the chat summary, in display order
+ISSUE_SECTIONS = (
+    ("ERROR_PAGE", "🚨", "Error Pages"),
+    ("BROKEN_LINK", "🔗", "Broken Links"),
+    ("BLANK_DESTINATION", "📄", "Blank Pages"),
+    ("NAVIGATION_ERROR", "🧭", "Navigation Errors"),
+)
+
+_bug_type = itemgetter("type")
+
+# First whitespace-delimited token in a chat message that looks like a URL
+_URL_RE = re.compile(r"(?i)(?<!\S)((?:https?://|localhost)\S*)")
+
+# Strong references to fire-and-forget tasks so they aren't garbage collected mid-flight
+_background_tasks = set()
+
+# LLM calls currently in flight, keyed like the reply cache
+_inflight: Dict[str, asyncio.Future] = {}
+
+async def get_browser():
+    """Return the shared crawler browser, relaunching it if it has gone away."""
+    async with app.state.browser_lock:
+        if app.state.browser is None or not app.state.browser.is_connected():
+            app.state.browser = await app.state.playwright.chromium.launch()
+    return app.state.browser
+
+def _log_level(default: str) -> str:
+    """LOG_LEVEL from the environment, or `default` when it isn't a known level name."""
+    level = os.getenv("LOG_LEVEL", default).upper()
+    if not isinstance(logging.getLevelName(level), int):
+        logger.warning("Unknown LOG_LEVEL %r, using %s", level, default)
+        return default
+    return level
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Set up and tear down long-lived resources."""
+    # Handlers only enqueue records; a listener thread does the formatting and
+    # terminal writes so logging never blocks the event loop. LOG_LEVEL=INFO
+    # turns on the crawler's per-page and per-link progress lines.
+    log_queue = SimpleQueue()
+    log_handler = logging.handlers.QueueHandler(log_queue)
+    log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler())
+    root_logger = logging.getLogger()
+    root_logger.setLevel(_log_level("WARNING"))
+    root_logger.addHandler(log_handler)
+    log_listener.start()
+    
+    # Everything created below is released in the finally block, even if a later step fails
+    app.state.http = None
+    app.state.llm_cache = None
+    app.state.playwright = None
+    app.state.browser = None
+    issue_batch_poller = None
+    try:
+        # One HTTP/2 keep-alive pool shared by every outbound API client
+        app.state.http = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=50),
+            timeout=60.0,
+        )
+        # Clients are only built when configured; callers check the API keys before using them
+        app.state.anthropic = AsyncAnthropic(api_key=ANTHROPIC_API_KEY, max_retries=2, timeout=30.0, http_client=app.state.http) if ANTHROPIC_API_KEY else None
+        app.state.openai = AsyncOpenAI(api_key=OPENAI_API_KEY, http_client=app.state.http) if OPENAI_API_KEY else None
+        
+        app.state.url_cache = crawler.UrlStatusCache()
+        app.state.chat_cache = OrderedDict()
+        app.state.host_limits = crawler.HostLimits()
+        app.state.llm_cache = await aiosqlite.connect(LLM_CACHE_PATH)
+        await app.state.llm_cache.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, val TEXT, exp REAL)"
+        )
+        await app.state.llm_cache.execute(
+            "CREATE TABLE IF NOT EXISTS issue_batches (batch_id TEXT PRIMARY KEY, target_url TEXT, issue_count INTEGER, fallback TEXT, attempts INTEGER NOT NULL DEFAULT 0)"
+        )
+        # Databases created before filing attempts were counted lack the column
+        async with app.state.llm_cache.execute("PRAGMA table_info(issue_batches)") as cursor:
+            columns = {row[1] for row in await cursor.fetchall()}
+        if "attempts" not in columns:
+            await app.state.llm_cache.execute("ALTER TABLE issue_batches ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        await app.state.llm_cache.commit()
+        
+        # Launch the browser up front so the first /scrape doesn't pay for it
+        app.state.playwright = await async_playwright().start()
+        app.state.browser_lock = asyncio.Lock()
+        try:
+            await get_browser()
+        except Exception as e:
+            logger.warning("Could not launch crawler browser, will retry on first crawl: %s", e)
+        
+        issue_batch_poller = asyncio.create_task(poll_issue_batches())
+        yield
+    finally:
+        if issue_batch_poller is not None:
+            issue_batch_poller.cancel()
+        if app.state.browser is not None:
+            await app.state.browser.close()
+        if app.state.playwright is not None:
+            await app.state.playwright.stop()
+        if app.state.llm_cache is not None:
+            await app.state.llm_cache.close()
+        if app.state.http is not None:
+            await app.state.http.aclose()
+        root_logger.removeHandler(log_handler)
+        log_listener.stop()
+
+app = FastAPI(title="Website Testing API", version="1.0.0", default_response_class=ORJSONResponse, lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # Allow all origins for development
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST"],  # The only methods any endpoint serves
+    allow_headers=["Content-Type", "Authorization"],
+    max_age=86400,  # Let browsers cache preflight results for a day
 )
 
 class ChatMessage(BaseModel):
@@ -44,12 +212,26 @@ class ChatMessage(BaseModel):
 class ChatRequest(BaseModel):
     messages: List[ChatMessage]
     url: str = None
+    refresh: bool = False  # Re-run the analysis and re-probe every link instead of reusing cached results
 
 class ChatResponse(BaseModel):
     message: str
     success: bool
     data: Dict[str, Any] = None
 
+class IssueOutput(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+    
+    title: str
+    body: str
+    labels: List[str]
+
+# Structured outputs: the model's reply is guaranteed to match IssueOutput
+ISSUE_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "github_issue", "schema": IssueOutput.model_json_schema(), "strict": True}
+}
+
 # Explicit OPTIONS handler
 @app.options("/chat")
 async def options_chat():
@@ -61,41 +243,140 @@ async def root():
     """Health check endpoint."""
     return {"message": "Website Testing API is running"}
 
+def _llm_cache_key(*parts: str) -> str:
+    """Hash everything that determines an LLM reply into a cache key."""
+    return hashlib.sha256("|".join(parts).encode()).hexdigest()
+
+async def _cache_get(key: str) -> Optional[str]:
+    """Return a cached LLM reply, or None if it is missing or expired."""
+    async with app.state.llm_cache.execute(
+        "SELECT val FROM llm_cache WHERE key = ? AND exp > ?", (key, time.time())
+    ) as cursor:
+        row = await cursor.fetchone()
+    return row[0] if row else None
+
+async def _cache_set(key: str, val: str, ttl: float = LLM_CACHE_TTL):
+    """Store an LLM reply for `ttl` seconds; a failed write only skips caching."""
+    try:
+        await app.state.llm_cache.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, val, exp) VALUES (?, ?, ?)", (key, val, time.time() + ttl)
+        )
+        await app.state.llm_cache.commit()
+    except Exception as e:
+        logger.warning("Error writing LLM cache entry: %s", e)
+
+def _chat_cache_key(target_url: str, content: str) -> str:
+    """Key a /chat analysis by target URL and normalized user message."""
+    normalized = " ".join(content.lower().split())
+    return hashlib.blake2b(f"{target_url}|{normalized}".encode(), digest_size=16).hexdigest()
+
+def _chat_cache_get(key: str) -> Optional["ChatResponse"]:
+    """Return a recent /chat analysis, or None if it is missing or expired."""
+    entry = app.state.chat_cache.get(key)
+    if entry is None:
+        return None
+    stored_at, response = entry
+    if time.time() - stored_at > CHAT_CACHE_TTL:
+        del app.state.chat_cache[key]
+        return None
+    return response
+
+def _chat_cache_set(key: str, response: "ChatResponse"):
+    """Store a /chat analysis, evicting the least recently stored past the cap."""
+    cache = app.state.chat_cache
+    cache[key] = (time.time(), response)
+    cache.move_to_end(key)
+    while len(cache) > CHAT_CACHE_SIZE:
+        cache.popitem(last=False)
+
+def _coalesced(key: str, call):
+    """Run `call()` once per key; concurrent callers with the same key await the same call."""
+    task = _inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(call())
+        _inflight[key] = task
+        task.add_done_callback(lambda _: _inflight.pop(key, None))
+    # Shielded so one caller going away doesn't cancel the call for the others
+    return asyncio.shield(task)
+
 async def summarize_message_with_claude(message: str) -> str:
     """Summarize a message using Anthropic Claude API."""
     if not ANTHROPIC_API_KEY:
         return message[:200] + "..." if len(message) > 200 else message
     
     try:
-        client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
+        client = app.state.anthropic
         
+        # The instructions are far below Anthropic's minimum cacheable prefix
+        # (1024 tokens), so they are sent as a plain system prompt without cache_control
         prompt = f"""
-Please provide a concise summary of the following message. The summary should be:
-- About 3-4 sentences - concise but descriptive and informative
-- Capture the main intent and key details
-- Maintain the original tone and context
-
 Message to summarize:
 {message}
 
 Summary:
 """
+        model = "claude-3-5-sonnet-20241022"
         
-        response = await client.messages.create(
-            model="claude-3-5-sonnet-20241022",
-            max_tokens=150,
-            system="You are a helpful assistant that creates concise, accurate summaries. Be brief but informative.",
-            messages=[{"role": "user", "content": prompt}]
-        )
+        cache_key = _llm_cache_key(model, SUMMARY_SYSTEM, prompt)
+        cached = await _cache_get(cache_key)
+        if cached is not None:
+            return cached
         
-        summary = response.content[0].text.strip()
-        return summary if summary else message[:200] + "..." if len(message) > 200 else message
+        async def summarize():
+            response = await client.messages.create(
+                model=model,
+                max_tokens=150,
+                system=SUMMARY_SYSTEM,
+                messages=[{"role": "user", "content": prompt}]
+            )
+            summary = "".join(block.text for block in response.content if block.type == "text").strip()
+            if summary:
+                await _cache_set(cache_key, summary)
+            return summary
+        
+        summary = await _coalesced(cache_key, summarize)
+        if not summary:
+            return message[:200] + "..." if len(message) > 200 else message
+        return summary
         
     except Exception as e:
-        print(f"Error summarizing message with Claude: {e}")
+        logger.warning("Error summarizing message with Claude: %s", e)
         # Fallback to simple truncation
         return message[:200] + "..." if len(message) > 200 else message
 
+def _build_issue_messages(issues: List[Dict], target_url: str) -> List[Dict[str, str]]:
+    """Chat messages for issue generation: static instructions, then the issues as JSON."""
+    issues_data = {"url": target_url, "issueCount": len(issues), "issues": issues[:10]}  # Limit to first 10 issues
+    return [
+        {"role": "system", "content": ISSUE_INSTRUCTIONS},
+        {"role": "user", "content": json.dumps(issues_data)}
+    ]
+
+def _parse_issue_output(content: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Validate a structured issue reply; None if the model refused or was cut off."""
+    try:
+        return IssueOutput.model_validate_json(content or "").model_dump()
+    except ValidationError:
+        return None
+
+def _fallback_issue_content(issues: List[Dict], target_url: str) -> Dict[str, Any]:
+    """Issue content used when the LLM reply can't be parsed."""
+    issues_summary = []
+    for i, issue in enumerate(issues[:10], 1):  # Limit to first 10 issues
+        issue_text = f"{i}. {issue.get('type', 'UNKNOWN')}: {issue.get('issue', 'No description')}"
+        if issue.get('page'):
+            issue_text += f" (Page: {issue.get('page')})"
+        if issue.get('link'):
+            issue_text += f" (Link: {issue.get('link')})"
+        issues_summary.append(issue_text)
+    issues_text = "\n".join(issues_summary)
+    
+    return {
+        "title": f"Website Issues Found on {target_url}",
+        "body": f"## Website Testing Results\n\n**URL:** {target_url}\n**Issues Found:** {len(issues)}\n\n### Issues:\n{issues_text}\n\n### Recommendations:\n- Review and fix broken links\n- Check error pages\n- Ensure all pages have proper content",
+        "labels": ["bug", "test-failure", "website"]
+    }
+
 async def generate_github_issue_content(issues: List[Dict], target_url: str) -> Dict[str, Any]:
     """Generate GitHub issue title, body, and labels using OpenAI API."""
     if not OPENAI_API_KEY:
@@ -106,82 +387,37 @@ async def generate_github_issue_content(issues: List[Dict], target_url: str) ->
         }
     
     try:
-        client = AsyncOpenAI(api_key=OPENAI_API_KEY)
-        
-        # Prepare issues data for the prompt
-        issues_summary = []
-        for i, issue in enumerate(issues[:10], 1):  # Limit to first 10 issues
-            issue_text = f"{i}. {issue.get('type', 'UNKNOWN')}: {issue.get('issue', 'No description')}"
-            if issue.get('page'):
-                issue_text += f" (Page: {issue.get('page')})"
-            if issue.get('link'):
-                issue_text += f" (Link: {issue.get('link')})"
-            issues_summary.append(issue_text)
+        client = app.state.openai
         
-        issues_text = "\n".join(issues_summary)
-        
-        prompt = f"""
-You are a QA engineer creating a GitHub issue for website testing results. 
-
-Website tested: {target_url}
-Number of issues found: {len(issues)}
-
-Issues found:
-{issues_text}
-
-Please create:
-1. A concise, descriptive title (max 100 characters)
-2. A detailed body with summary, categorized issues, and recommendations
-3. Appropriate GitHub labels (2-4 labels)
-
-Return your response in this exact JSON format:
-{{
-    "title": "Your title here",
-    "body": "Your detailed body here",
-    "labels": ["label1", "label2", "label3"]
-}}
-
-The body should include:
-- Summary of testing
-- Categorized issues (Error Pages, Broken Links, etc.)
-- Severity assessment
-- Recommendations for fixing
-- Technical details for developers
-
-Use markdown formatting in the body.
-"""
-
-        response = await client.responses.create(
-            model="gpt-4.1",
-            instructions="You are a QA engineer creating GitHub issues for website testing results. Be concise, professional, and actionable.",
-            input=prompt,
-            temperature=0.3
-        )
+        messages = _build_issue_messages(issues, target_url)
         
-        # Parse the response
-        content = response.output_text.strip()
+        cache_key = _llm_cache_key(ISSUE_MODEL, ISSUE_INSTRUCTIONS, str(ISSUE_TEMPERATURE), messages[-1]["content"])
+        cached = await _cache_get(cache_key)
+        if cached is not None:
+            return json.loads(cached)
+
+        async def generate():
+            response = await client.chat.completions.create(
+                model=ISSUE_MODEL,
+                messages=messages,
+                temperature=ISSUE_TEMPERATURE,
+                response_format=ISSUE_RESPONSE_FORMAT
+            )
+            
+            result = _parse_issue_output(response.choices[0].message.content)
+            if result is not None:
+                await _cache_set(cache_key, json.dumps(result))
+            return result
         
-        # Try to extract JSON from the response
-        try:
-            # Look for JSON in the response
-            start_idx = content.find('{')
-            end_idx = content.rfind('}') + 1
-            if start_idx != -1 and end_idx != 0:
-                json_str = content[start_idx:end_idx]
-                result = json.loads(json_str)
-                return result
-            else:
-                raise ValueError("No JSON found in response")
-        except (json.JSONDecodeError, ValueError):
-            # Fallback if JSON parsing fails
-            return {
-                "title": f"Website Issues Found on {target_url}",
-                "body": f"## Website Testing Results\n\n**URL:** {target_url}\n**Issues Found:** {len(issues)}\n\n### Issues:\n{issues_text}\n\n### Recommendations:\n- Review and fix broken links\n- Check error pages\n- Ensure all pages have proper content",
-                "labels": ["bug", "test-failure", "website"]
-            }
+        result = await _coalesced(cache_key, generate)
+        if result is None:
+            # Fallback if the model refused or ran out of tokens
+            return _fallback_issue_content(issues, target_url)
+        # Callers may share this result, so hand each one its own copy
+        return dict(result)
             
     except Exception as e:
-        print(f"Error generating GitHub issue content: {e}")
+        logger.warning("Error generating GitHub issue content: %s", e)
         # Fallback response
         return {
             "title": f"Website Issues Found on {target_url}",
@@ -189,373 +425,220 @@ Use markdown formatting in the body.
             "labels": ["bug", "test-failure"]
         }
 
-async def run_stagehand_crawler(url: str) -> Dict[str, Any]:
-    """Run the integrated Stagehand crawler on a URL."""
+async def create_github_issue(issue_content: Dict[str, Any], target_url: str, issue_count: int):
+    """Post a generated issue to the configured GitHub repository."""
+    title = issue_content.get("title", f"Website Issues Found on {target_url}")
+    body = issue_content.get("body", f"Found {issue_count} issues during website testing.")
+    labels = issue_content.get("labels", ["bug", "test-failure"])
+    
+    data = {
+        "title": title,
+        "body": body,
+        "labels": labels or ["bug", "test-failure"]
+    }
+    
+    url = f"https://api.github.com/repos/{GITHUB_REPO}/issues"
+    
+    response = await app.state.http.post(url, headers=GITHUB_HEADERS, json=data, timeout=10.0)
+    
+    # The created issue's JSON isn't used, so the body is never decoded
+    if response.status_code != 201:
+        logger.warning("GitHub issue creation failed with HTTP %s", response.status_code)
+    return response
+
+async def file_github_issue(issues: List[Dict], target_url: str):
+    """Generate issue content with OpenAI right away and post it to GitHub."""
+    issue_content = await generate_github_issue_content(issues, target_url)
+    return await create_github_issue(issue_content, target_url, len(issues))
+
+async def submit_issue_batch(issues: List[Dict], target_url: str):
+    """Queue issue generation on the OpenAI Batch API; process_issue_batches files it once done."""
     try:
-        # Create a Node.js script that uses Stagehand
-        crawler_script = f"""
-import {{ Stagehand }} from "@browserbasehq/stagehand";
-import {{ z }} from "zod";
-
-const targetUrl = "{url}";
-
-console.log("INTEGRATED STAGEHAND CRAWLER");
-console.log("With Detailed Progress Logging");
-console.log("================================");
-
-// Initialize Stagehand
-const stagehand = new Stagehand({{
-    env: "LOCAL",
-    verbose: 0,
-}});
-
-await stagehand.init();
-const page = stagehand.page;
-
-try {{
-    const startTime = Date.now();
-    let visitedUrls = new Set();
-    let testedLinks = new Set(); // Track tested link combinations: "page->destination"
-    let problematicUrls = new Set(); // Track URLs that are broken/blank and should never be crawled
-    let reportedBlankPages = new Set(); // Track URLs we've already reported as blank destinations
-    let urlQueue = [targetUrl.endsWith('/') ? targetUrl.slice(0, -1) : targetUrl]; // Normalize initial URL
-    let bugs = [];
-    let pageCount = 0;
-    const maxPages = 10; // Increased limit
-
-    console.log(`Starting crawl from: ${{targetUrl}}`);
-    console.log(`Max pages limit: ${{maxPages}}`);
-
-    // Helper function to normalize URLs consistently
-    function normalizeUrl(url) {{
-        try {{
-            const urlObj = new URL(url);
-            return urlObj.origin + urlObj.pathname.replace(/\\/+$/, '');
-        }} catch (e) {{
-            return url.endsWith('/') ? url.slice(0, -1) : url;
-        }}
-    }}
-
-    // Enhanced crawling function with detailed logging
-    async function crawlPage(currentUrl) {{
-        const normalizedCurrentUrl = normalizeUrl(currentUrl);
+        request_line = {
+            "custom_id": "github-issue",
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {
+                "model": ISSUE_MODEL,
+                "temperature": ISSUE_TEMPERATURE,
+                "messages": _build_issue_messages(issues, target_url),
+                "response_format": ISSUE_RESPONSE_FORMAT
+            }
+        }
         
-        if (visitedUrls.has(normalizedCurrentUrl) || pageCount >= maxPages) {{
-            return;
-        }}
+        client = app.state.openai
+        batch_file = await client.files.create(
+            file=("github_issue.jsonl", json.dumps(request_line).encode()),
+            purpose="batch"
+        )
+        batch = await client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
         
-        visitedUrls.add(normalizedCurrentUrl);
-        pageCount++;
+        await app.state.llm_cache.execute(
+            "INSERT INTO issue_batches (batch_id, target_url, issue_count, fallback) VALUES (?, ?, ?, ?)",
+            (batch.id, target_url, len(issues), json.dumps(_fallback_issue_content(issues, target_url)))
+        )
+        await app.state.llm_cache.commit()
         
-        console.log(`\\n[${{pageCount}}] Testing: ${{normalizedCurrentUrl.replace(targetUrl, '') || '/'}}`);
+    except Exception as e:
+        logger.warning("Error submitting GitHub issue batch, generating inline instead: %s", e)
+        await file_github_issue(issues, target_url)
+
+async def _batch_issue_content(client, batch, fallback: str) -> Dict[str, Any]:
+    """Issue content from a finished batch's output, or the stored fallback."""
+    if batch.status == "completed" and batch.output_file_id:
+        output = await client.files.content(batch.output_file_id)
+        for line in output.text.splitlines():
+            try:
+                result = json.loads(line)
+                content = result["response"]["body"]["choices"][0]["message"]["content"]
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                logger.warning("Skipping malformed output line in batch %s: %s", batch.id, e)
+                continue
+            issue_content = _parse_issue_output(content)
+            if issue_content is not None:
+                return issue_content
+    return json.loads(fallback)
+
+async def process_issue_batches():
+    """File GitHub issues for any finished generation batches."""
+    db = app.state.llm_cache
+    async with db.execute("SELECT batch_id, target_url, issue_count, fallback, attempts FROM issue_batches") as cursor:
+        rows = await cursor.fetchall()
+    
+    client = app.state.openai
+    for batch_id, target_url, issue_count, fallback, attempts in rows:
+        try:
+            batch = await client.batches.retrieve(batch_id)
+        except Exception as e:
+            logger.warning("Error checking GitHub issue batch %s: %s", batch_id, e)
+            continue
+        if batch.status not in ("completed", "failed", "expired", "cancelled"):
+            continue
         
-        try {{
-            const response = await page.goto(normalizedCurrentUrl, {{ waitUntil: 'domcontentloaded' }});
-            await page.waitForTimeout(1000);
-            
-            const pageData = await page.evaluate(() => {{
-                const links = Array.from(document.querySelectorAll('a[href]')).map(a => ({{
-                    text: a.textContent.trim(),
-                    href: a.href,
-                    isInternal: a.href.startsWith(window.location.origin)
-                }}));
-                
-                const buttons = Array.from(document.querySelectorAll('button, input[type="button"], input[type="submit"]')).map(btn => ({{
-                    text: btn.textContent.trim() || btn.value || btn.getAttribute('aria-label') || 'Button',
-                    type: btn.type || 'button'
-                }}));
-                
-                return {{
-                    title: document.title,
-                    url: window.location.href,
-                    html: document.documentElement.outerHTML,
-                    links: links.filter(l => l.text && l.isInternal).slice(0, 30),
-                    buttons: buttons.slice(0, 8),
-                    hasContent: document.body.textContent.length > 100,
-                    isErrorPage: document.title.toLowerCase().includes('404') || 
-                               document.body.textContent.toLowerCase().includes('404 not found') ||
-                               document.title.toLowerCase().includes('error') ||
-                               document.body.textContent.toLowerCase().includes('page not found') ||
-                               document.body.textContent.toLowerCase().includes('not found')
-                }};
-            }});
-            
-            // Check HTTP status code for errors
-            const statusCode = response.status();
-            const isHttpError = statusCode >= 400;
-            
-            console.log(`   Page: "${{pageData.title}}" (Status: ${{statusCode}})`);
-            console.log(`   Found ${{pageData.links.length}} internal links`);
-            console.log(`   Found ${{pageData.buttons.length}} buttons`);
-            
-            // Check for basic issues - prioritize HTTP errors
-            if (isHttpError || pageData.isErrorPage) {{
-                bugs.push({{
-                    type: "ERROR_PAGE",
-                    page: normalizedCurrentUrl,
-                    issue: `Error page detected: ${{pageData.title}} (HTTP ${{statusCode}})`,
-                    severity: "high",
-                    statusCode: statusCode
-                }});
-                console.log(`   ERROR PAGE DETECTED (HTTP ${{statusCode}})`);
-                // Mark this URL as visited so it doesn't get crawled again from other sources
-                visitedUrls.add(normalizedCurrentUrl);
-                return pageData;
-            }}
-            
-            if (!pageData.hasContent) {{
-                // Only report blank page if we haven't already reported it as a blank destination
-                if (!reportedBlankPages.has(normalizedCurrentUrl)) {{
-                    bugs.push({{
-                        type: "BLANK_PAGE", 
-                        page: normalizedCurrentUrl,
-                        issue: "Page appears to be blank or has very little content",
-                        severity: "medium"
-                    }});
-                    console.log(`   LOW CONTENT WARNING`);
-                }} else {{
-                    console.log(`   Page is blank (already reported as link destination)`);
-                }}
-                // Mark this URL as visited so it doesn't get crawled again from other sources
-                visitedUrls.add(normalizedCurrentUrl);
-                return pageData; // Don't process links from blank pages
-            }}
-            
-            // Test ALL links - but skip duplicates efficiently
-            for (let i = 0; i < pageData.links.length; i++) {{
-                const link = pageData.links[i];
-                const normalizedDest = normalizeUrl(link.href);
-                
-                // Skip if it's the same page we're already on
-                if (normalizedDest === normalizedCurrentUrl) {{
-                    console.log(`   [${{i+1}}/${{pageData.links.length}}] Skipping "${{link.text}}" (same page)`);
-                    continue;
-                }}
-                
-                // Create unique identifier for this link test
-                const linkTestId = `${{normalizedDest}}`;
-                
-                // Skip if we've already tested this destination URL
-                if (testedLinks.has(linkTestId)) {{
-                    console.log(`   [${{i+1}}/${{pageData.links.length}}] Skipping "${{link.text}}" -> ${{normalizedDest.replace(targetUrl, '')}} (already tested)`);
-                    continue;
-                }}
-                
-                console.log(`   [${{i+1}}/${{pageData.links.length}}] Testing link: "${{link.text}}"`);
-                testedLinks.add(linkTestId); // Mark as tested
-                
-                try {{
-                    const linkResponse = await page.goto(link.href, {{ waitUntil: 'domcontentloaded' }});
-                    await page.waitForTimeout(500);
-                    
-                    const result = await page.evaluate(() => ({{
-                        title: document.title,
-                        url: window.location.href,
-                        isError: document.title.toLowerCase().includes('404') || 
-                                document.body.textContent.toLowerCase().includes('404 not found') ||
-                                document.title.toLowerCase().includes('error') ||
-                                document.body.textContent.toLowerCase().includes('page not found') ||
-                                document.body.textContent.toLowerCase().includes('not found'),
-                        hasContent: document.body.textContent.length > 100
-                    }}));
-                    
-                    // Check HTTP status for the link destination
-                    const linkStatusCode = linkResponse.status();
-                    const isLinkHttpError = linkStatusCode >= 400;
-                    
-                    // Normalize result URL the same way
-                    const normalizedResultUrl = normalizeUrl(result.url);
-                    
-                    console.log(`      -> ${{normalizedResultUrl.replace(targetUrl, '')}} (Status: ${{linkStatusCode}})`);
-                    
-                    if (isLinkHttpError || result.isError) {{
-                        bugs.push({{
-                            type: "BROKEN_LINK",
-                            page: normalizedCurrentUrl,
-                            link: link.text,
-                            destination: normalizedResultUrl,
-                            issue: `Link "${{link.text}}" leads to error page (HTTP ${{linkStatusCode}})`,
-                            severity: "high",
-                            statusCode: linkStatusCode
-                        }});
-                        console.log(`      BROKEN LINK (HTTP ${{linkStatusCode}})`);
-                        // Mark as problematic so it won't be crawled separately
-                        problematicUrls.add(normalizedResultUrl);
-                        // Remove from queue if it's there
-                        const queueIndex = urlQueue.indexOf(normalizedResultUrl);
-                        if (queueIndex > -1) {{
-                            urlQueue.splice(queueIndex, 1);
-                            console.log(`      Removed from crawl queue: ${{normalizedResultUrl.replace(targetUrl, '')}}`);
-                        }}
-                    }} else if (!result.hasContent) {{
-                        bugs.push({{
-                            type: "BLANK_DESTINATION",
-                            page: normalizedCurrentUrl,
-                            link: link.text,
-                            destination: normalizedResultUrl,
-                            issue: `Link "${{link.text}}" leads to blank page`,
-                            severity: "medium"
-                        }});
-                        console.log(`      BLANK DESTINATION`);
-                        reportedBlankPages.add(normalizedResultUrl);
-                        // Remove from queue if it's there
-                        const queueIndex = urlQueue.indexOf(normalizedResultUrl);
-                        if (queueIndex > -1) {{
-                            urlQueue.splice(queueIndex, 1);
-                            console.log(`      Removed from crawl queue: ${{normalizedResultUrl.replace(targetUrl, '')}}`);
-                        }}
-                    }} else {{
-                        // Add to queue for crawling if not already there and not problematic
-                        if (!urlQueue.includes(normalizedResultUrl) && !problematicUrls.has(normalizedResultUrl)) {{
-                            urlQueue.push(normalizedResultUrl);
-                            console.log(`      Added to crawl queue: ${{normalizedResultUrl.replace(targetUrl, '')}}`);
-                        }}
-                    }}
-                }} catch (linkError) {{
-                    console.log(`      ERROR testing link: ${{linkError.message}}`);
-                    bugs.push({{
-                        type: "NAVIGATION_ERROR",
-                        page: normalizedCurrentUrl,
-                        link: link.text,
-                        destination: link.href,
-                        issue: `Failed to navigate to link: ${{linkError.message}}`,
-                        severity: "medium"
-                    }});
-                }}
-            }}
-            
-            return pageData;
-        }} catch (pageError) {{
-            console.log(`   ERROR crawling page: ${{pageError.message}}`);
-            bugs.push({{
-                type: "NAVIGATION_ERROR",
-                page: normalizedCurrentUrl,
-                issue: `Failed to load page: ${{pageError.message}}`,
-                severity: "high"
-            }});
-            return null;
-        }}
-    }}
-
-    // Main crawling loop
-    while (urlQueue.length > 0 && pageCount < maxPages) {{
-        const currentUrl = urlQueue.shift();
-        await crawlPage(currentUrl);
-    }}
-
-    const endTime = Date.now();
-    const duration = Math.round((endTime - startTime) / 1000);
-
-    console.log("\\nCRAWLER_RESULT_START");
-    console.log(JSON.stringify({{
-        success: true,
-        bugs: bugs,
-        pagesVisited: pageCount,
-        duration: duration,
-        url: targetUrl
-    }}));
-    console.log("CRAWLER_RESULT_END");
-
-}} catch (error) {{
-    console.log("CRAWLER_RESULT_START");
-    console.log(JSON.stringify({{
-        success: false,
-        error: error.message,
-        url: targetUrl
-    }}));
-    console.log("CRAWLER_RESULT_END");
-}} finally {{
-    await stagehand.close();
-}}
-"""
+        # Claim the batch so only one worker process files its issue
+        cursor = await db.execute("DELETE FROM issue_batches WHERE batch_id = ?", (batch_id,))
+        await db.commit()
+        if cursor.rowcount != 1:
+            continue
         
-        # Write the script to a temporary file
-        script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_crawler.mjs")
-        with open(script_path, "w", encoding='utf-8') as f:
-            f.write(crawler_script)
+        try:
+            issue_content = await _batch_issue_content(client, batch, fallback)
+            response = await create_github_issue(issue_content, target_url, issue_count)
+            status = response.status_code
+        except Exception as e:
+            logger.warning("Error filing GitHub issue for batch %s: %s", batch_id, e)
+            status = None
         
-        # Run the Node.js script from the backend directory
-        backend_dir = os.path.dirname(os.path.abspath(__file__))
-        result = subprocess.run(
-            ["node", "temp_crawler.mjs"],
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='replace',  # Replace problematic characters instead of failing
-            timeout=60,  # 60 second timeout
-            cwd=backend_dir
-        )
+        if status == 201:
+            continue
+        # A 4xx other than rate limiting (bad token, unknown repo, rejected body) won't succeed on retry
+        if status is not None and 400 <= status < 500 and status != 429:
+            logger.error("Dropping GitHub issue for batch %s (%s): HTTP %s", batch_id, target_url, status)
+            continue
+        attempts += 1
+        if attempts >= ISSUE_BATCH_MAX_ATTEMPTS:
+            logger.error("Dropping GitHub issue for batch %s (%s) after %d attempts", batch_id, target_url, attempts)
+            continue
         
-        if result.returncode == 0:
-            try:
-                # Clean up
-                if os.path.exists(script_path):
-                    os.remove(script_path)
-                
-                # Extract JSON result from console output
-                output = result.stdout
-                start_marker = "CRAWLER_RESULT_START"
-                end_marker = "CRAWLER_RESULT_END"
-                
-                if start_marker in output and end_marker in output:
-                    start_idx = output.find(start_marker) + len(start_marker)
-                    end_idx = output.find(end_marker)
-                    json_str = output[start_idx:end_idx].strip()
-                    return json.loads(json_str)
-                else:
-                    # Fallback to old method
-                    return json.loads(output.strip())
-                    
-            except json.JSONDecodeError:
-                # Clean up on error too
-                if os.path.exists(script_path):
-                    os.remove(script_path)
-                return {
-                    "success": False,
-                    "error": "Failed to parse crawler output",
-                    "raw_output": result.stdout
-                }
-        else:
-            # Clean up on error
-            if os.path.exists(script_path):
-                os.remove(script_path)
-            return {
-                "success": False,
-                "error": f"Crawler failed with exit code {result.returncode}",
-                "stderr": result.stderr,
-                "stdout": result.stdout
-            }
-            
-    except subprocess.TimeoutExpired:
-        # Clean up on timeout
-        if os.path.exists(script_path):
-            os.remove(script_path)
-        return {
-            "success": False,
-            "error": "Crawler timed out after 60 seconds"
-        }
-    except Exception as e:
-        # Clean up on exception
+        # Release the claim so the next poll retries this batch
+        await db.execute(
+            "INSERT OR IGNORE INTO issue_batches (batch_id, target_url, issue_count, fallback, attempts) VALUES (?, ?, ?, ?, ?)",
+            (batch_id, target_url, issue_count, fallback, attempts)
+        )
+        await db.commit()
+
+async def poll_issue_batches():
+    """Background loop that periodically checks pending issue batches."""
+    while True:
+        await asyncio.sleep(ISSUE_BATCH_POLL_INTERVAL)
+        if not OPENAI_API_KEY:
+            continue
         try:
-            script_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_crawler.mjs")
-            if os.path.exists(script_path):
-                os.remove(script_path)
-        except:
-            pass
-        return {
-            "success": False,
-            "error": f"Failed to run crawler: {str(e)}"
-        }
+            await process_issue_batches()
+        except Exception as e:
+            logger.warning("Error polling GitHub issue batches: %s", e)
+
+async def crawl_events(url: str, refresh: bool = False):
+    """Run the crawler on a URL, yielding each bug and page as they come and then the result."""
+    queue = asyncio.Queue()
+    
+    async def run():
+        try:
+            result = await crawler.crawl(await get_browser(), url, app.state.url_cache, app.state.host_limits, queue.put_nowait, refresh)
+        except Exception as e:
+            result = {"success": False, "error": f"Failed to run crawler: {str(e)}"}
+        queue.put_nowait({"result": result})
+    
+    job = asyncio.create_task(run())
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + 60  # 60 second timeout
+    try:
+        while True:
+            message = await asyncio.wait_for(queue.get(), timeout=deadline - loop.time())
+            if "bug" in message:
+                yield {"type": "bug", "bug": message["bug"]}
+            elif "page" in message:
+                yield {"type": "page", "url": message["page"]}
+            else:
+                yield {"type": "result", "result": message["result"]}
+                return
+    except asyncio.TimeoutError:
+        # Everything already yielded stands; mark the result as partial instead of failing
+        yield {"type": "result", "result": {
+            "success": True,
+            "partial": True,
+            "duration": 60,
+            "url": url
+        }}
+    finally:
+        # Stops the crawl on timeout or when a streaming client goes away
+        job.cancel()
+
+async def collected_crawl_events(url: str, refresh: bool = False):
+    """Like crawl_events, but the final result also carries every bug found and the page count."""
+    bugs = []
+    pages = 0
+    async for event in crawl_events(url, refresh):
+        if event["type"] == "bug":
+            bugs.append(event["bug"])
+        elif event["type"] == "page":
+            pages += 1
+        elif event["result"].get("success"):
+            event["result"]["bugs"] = bugs
+            event["result"].setdefault("pagesVisited", pages)
+        yield event
+
+async def run_stagehand_crawler(url: str) -> Dict[str, Any]:
+    """Run the integrated crawler on a URL."""
+    async for event in collected_crawl_events(url):
+        if event["type"] == "result":
+            return event["result"]
 
 @app.post("/scrape")
 async def scrape_website(request: dict):
-    """Scrape a website using Stagehand crawler."""
+    """Scrape a website using the crawler."""
     url = request.get("url")
     if not url:
         raise HTTPException(status_code=400, detail="URL is required")
     
-    result = await run_stagehand_crawler(url)
-    return result
+    return await run_stagehand_crawler(url)
+
+@app.post("/scrape/stream")
+async def scrape_website_stream(request: dict):
+    """Like /scrape, but streams NDJSON events as bugs are found."""
+    url = request.get("url")
+    if not url:
+        raise HTTPException(status_code=400, detail="URL is required")
+    
+    async def ndjson():
+        async for event in crawl_events(url):
+            yield orjson.dumps(event) + b"\n"
+    
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
 
 # @app.post("/summarize")
 # async def summarize_message(request: dict):
@@ -571,9 +654,15 @@ async def scrape_website(request: dict):
 #         "success": True
 #     }
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """Handle chat messages and perform website testing."""
+async def parse_chat_request(raw_request: Request) -> ChatRequest:
+    """Validate a chat body with pydantic-core's JSON parser instead of json.loads + validate."""
+    try:
+        return ChatRequest.model_validate_json(await raw_request.body())
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False))
+
+async def chat_events(request: ChatRequest):
+    """Handle a chat turn, yielding crawl and status progress and then the final ChatResponse."""
     try:
         user_message = request.messages[-1].content.lower()
         
@@ -581,143 +670,177 @@ async def chat(request: ChatRequest):
         target_url = request.url
         if not target_url:
             # Try to extract URL from message
-            words = request.messages[-1].content.split()
-            for word in words:
-                if word.startswith(('http://', 'https://', 'localhost')):
-                    target_url = word if word.startswith(('http://', 'https://')) else f"http://{word}"
-                    break
+            match = _URL_RE.search(request.messages[-1].content)
+            if match:
+                target_url = match.group(1)
+                if not target_url.lower().startswith(('http://', 'https://')):
+                    target_url = f"http://{target_url}"
         
         if not target_url:
-            return ChatResponse(
+            yield {"type": "response", "response": ChatResponse(
                 success=True,
                 message="🤖 Hi! I can help you test websites. Please provide a URL to test, like 'test localhost:3001' or 'scrape https://example.com'",
                 data={"action": "help"}
-            )
+            )}
+            return
         
         # Determine action based on message content
         if any(keyword in user_message for keyword in ['scrape', 'crawl', 'test', 'analyze']):
-            # Run the crawler
-            crawler_result = await run_stagehand_crawler(target_url)
+            # Reuse a recent identical analysis unless the request asks for a refresh,
+            # which re-probes every link and replaces the same cache entry
+            cache_key = _chat_cache_key(target_url, request.messages[-1].content)
+            if not request.refresh:
+                cached = _chat_cache_get(cache_key)
+                if cached is not None:
+                    yield {"type": "response", "response": cached}
+                    return
+            
+            # Run the crawler, passing its progress through
+            async for event in collected_crawl_events(target_url, refresh=request.refresh):
+                if event["type"] == "result":
+                    crawler_result = event["result"]
+                else:
+                    yield event
             
             if crawler_result.get("success"):
                 issues = crawler_result.get("bugs", [])
                 pages_visited = crawler_result.get("pagesVisited", 0)
                 duration = crawler_result.get("duration", "unknown")
+                issue_task = None
                 
                 if issues:
-                    message = f"🔍 **Website Analysis Complete!**\n\n"
-                    message += f"📊 **Summary:**\n"
-                    message += f"• Pages visited: {pages_visited}\n"
-                    message += f"• Duration: {duration}s\n"
-                    message += f"• Issues found: {len(issues)}\n\n"
-
-                    headers = {
-                        "Authorization": f"Bearer {GITHUB_TOKEN}",
-                        "Accept": "application/vnd.github.v3+json",
-                        "X-Github-Api-Version": "2022-11-28"
-                    }
-
-                    # Use OpenAI to generate title, body, and labels
-                    issue_content = await generate_github_issue_content(issues, target_url)
-                    title = issue_content.get("title", f"Website Issues Found on {target_url}")
-                    body = issue_content.get("body", f"Found {len(issues)} issues during website testing.")
-                    labels = issue_content.get("labels", ["bug", "test-failure"])
-                    
-                    data = {
-                        "title": title,
-                        "body": body,
-                        "labels": labels or ["bug", "test-failure"]
-                    }
-                    
-                    url = f"https://api.github.com/repos/{GITHUB_REPO}/issues"
-                    
-                    response = requests.post(url, headers=headers, json=data)
-                    
-                    if response.status_code == 201:
-                        issue_data = response.json()
-                    
-                    # Categorize issues
-                    error_pages = [bug for bug in issues if bug['type'] == 'ERROR_PAGE']
-                    broken_links = [bug for bug in issues if bug['type'] == 'BROKEN_LINK']
-                    blank_pages = [bug for bug in issues if bug['type'] == 'BLANK_DESTINATION']
-                    nav_errors = [bug for bug in issues if bug['type'] == 'NAVIGATION_ERROR']
-                    
-                    if error_pages:
-                        message += f"🚨 **Error Pages ({len(error_pages)}):**\n"
-                        for issue in error_pages[:3]:
-                            message += f"• {issue['issue']}\n"
+                    parts = [f"🔍 **Website Analysis Complete!**\n\n"]
+                    parts.append(f"📊 **Summary:**\n")
+                    parts.append(f"• Pages visited: {pages_visited}\n")
+                    parts.append(f"• Duration: {duration}s\n")
+                    parts.append(f"• Issues found: {len(issues)}\n")
+                    if crawler_result.get("partial"):
+                        parts.append(f"• ⏱️ Crawl stopped at the 60 second limit; results are partial\n")
+
+                    if not DEFER_GITHUB_ISSUES or not OPENAI_API_KEY:
+                        yield {"type": "status", "message": "Creating GitHub issue..."}
+                        # Use OpenAI to generate title, body, and labels right away,
+                        # overlapping with formatting and summarizing the reply below
+                        issue_task = asyncio.create_task(file_github_issue(issues, target_url))
+                    else:
+                        # Deferred filing is enabled; the issue isn't needed for this reply,
+                        # so generate it cheaply via the Batch API
+                        task = asyncio.create_task(submit_issue_batch(issues, target_url))
+                        _background_tasks.add(task)
+                        task.add_done_callback(_background_tasks.discard)
                     
-                    if broken_links:
-                        message += f"\n🔗 **Broken Links ({len(broken_links)}):**\n"
-                        for issue in broken_links[:3]:
-                            message += f"• {issue['issue']}\n"
+                    # Categorize issues in one pass
+                    buckets = defaultdict(list)
+                    for bug in issues:
+                        buckets[_bug_type(bug)].append(bug)
                     
-                    if blank_pages:
-                        message += f"\n📄 **Blank Pages ({len(blank_pages)}):**\n"
-                        for issue in blank_pages[:3]:
-                            message += f"• {issue['issue']}\n"
+                    for bug_type, emoji, label in ISSUE_SECTIONS:
+                        bucket = buckets.get(bug_type)
+                        if bucket:
+                            parts.append(f"\n{emoji} **{label} ({len(bucket)}):**\n")
+                            parts.extend(f"• {issue['issue']}\n" for issue in bucket[:3])
                     
-                    if nav_errors:
-                        message += f"\n🧭 **Navigation Errors ({len(nav_errors)}):**\n"
-                        for issue in nav_errors[:3]:
-                            message += f"• {issue['issue']}\n"
-                    
-                    message += f"\n📋 Full details available in the technical data below."                    
+                    parts.append(f"\n📋 Full details available in the technical data below.")
+                
+                else:
+                    parts = [f"✅ **Great news!** No issues found on {target_url}\n\n"]
+                    parts.append(f"📊 **Summary:**\n")
+                    parts.append(f"• Pages visited: {pages_visited}\n")
+                    parts.append(f"• Duration: {duration}s\n")
+                    if crawler_result.get("partial"):
+                        parts.append(f"• ⏱️ Crawl stopped at the 60 second limit; results are partial\n")
+                    parts.append(f"• All tested links and pages are working correctly!")
                 
+                yield {"type": "status", "message": "Summarizing results..."}
+                if issue_task:
+                    message, _ = await asyncio.gather(summarize_message_with_claude("".join(parts)), issue_task)
                 else:
-                    message = f"✅ **Great news!** No issues found on {target_url}\n\n"
-                    message += f"📊 **Summary:**\n"
-                    message += f"• Pages visited: {pages_visited}\n"
-                    message += f"• Duration: {duration}s\n"
-                    message += f"• All tested links and pages are working correctly!"
-                  
-                message = await summarize_message_with_claude(message)
+                    message = await summarize_message_with_claude("".join(parts))
                 
-                return ChatResponse(
+                response = ChatResponse(
                     success=True,
                     message=message,
                     data=crawler_result
                 )
+                if not crawler_result.get("partial"):
+                    _chat_cache_set(cache_key, response)
+                yield {"type": "response", "response": response}
             else:
-                return ChatResponse(
+                yield {"type": "response", "response": ChatResponse(
                     success=False,
                     message=f"❌ Failed to analyze {target_url}: {crawler_result.get('error', 'Unknown error')}",
                     data=crawler_result
-                )
+                )}
         else:
-            return ChatResponse(
+            yield {"type": "response", "response": ChatResponse(
                 success=True,
                 message=f"🤖 I can help you test {target_url}! Try asking me to 'scrape {target_url}' or 'analyze {target_url}' to find issues.",
                 data={"action": "help", "url": target_url}
-            )
+            )}
     
     except Exception as e:
-        return ChatResponse(
+        yield {"type": "response", "response": ChatResponse(
             success=False,
             message=f"❌ An error occurred: {str(e)}"
-        )
+        )}
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat(raw_request: Request):
+    """Handle chat messages and perform website testing."""
+    request = await parse_chat_request(raw_request)
+    async for event in chat_events(request):
+        if event["type"] == "response":
+            return event["response"]
+
+@app.post("/chat/stream")
+async def chat_stream(raw_request: Request):
+    """Like /chat, but streams progress as Server-Sent Events while the analysis runs."""
+    request = await parse_chat_request(raw_request)
+    
+    async def sse():
+        async for event in chat_events(request):
+            if event["type"] == "response":
+                event = {"type": "response", **event["response"].model_dump()}
+            yield b"data: " + orjson.dumps(event) + b"\n\n"
+    
+    return StreamingResponse(sse(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+# The tool list never changes at runtime, so it is serialized once at import
+TOOLS_JSON = orjson.dumps({
+    "tools": [
+        {
+            "name": "scrape_website",
+            "description": "Crawl and analyze a website for issues using Playwright",
+            "inputSchema": {
+                "type": "object",
+                "properties": {
+                    "url": {
+                        "type": "string",
+                        "description": "The URL to analyze"
+                    }
+                },
+                "required": ["url"]
+            }
+        }
+    ]
+})
+TOOLS_ETAG = f'"{hashlib.sha256(TOOLS_JSON).hexdigest()[:16]}"'
 
 @app.get("/tools")
-async def list_tools():
+async def list_tools(request: Request):
     """List available tools."""
-    return {
-        "tools": [
-            {
-                "name": "scrape_website",
-                "description": "Crawl and analyze a website for issues using Stagehand",
-                "inputSchema": {
-                    "type": "object",
-                    "properties": {
-                        "url": {
-                            "type": "string",
-                            "description": "The URL to analyze"
-                        }
-                    },
-                    "required": ["url"]
-                }
-            }
-        ]
-    }
+    if request.headers.get("if-none-match") == TOOLS_ETAG:
+        return Response(status_code=304, headers={"ETag": TOOLS_ETAG})
+    return Response(content=TOOLS_JSON, media_type="application/json", headers={"ETag": TOOLS_ETAG})
 
 if __name__ == "__main__":
-    uvicorn.run(app, host="127.0.0.1", port=8000)
+    # One worker by default: each worker launches its own Chromium, and the per-host crawl limits,
+    # in-flight LLM coalescing, /chat cache and URL status cache all live in process memory.
+    # WEB_CONCURRENCY > 1 trades those guarantees (and SQLite write contention) for throughput.
+    # Multiple workers need an import string; uvloop/httptools are picked up automatically when installed
+    uvicorn.run(
+        "api_server:app",
+        host="127.0.0.1",
+        port=8000,
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
@@ -0,0 +1,393 @@
+"""
+Broken-link crawler that runs inside the API server on Playwright's async API.
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from playwright.async_api import APIRequestContext, Browser, Page, TimeoutError as PlaywrightTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Number of link probes run concurrently per crawl job
+LINK_CONCURRENCY = 8
+# Requests in flight to one host across every concurrent crawl; past this,
+# sites start timing out or blocking instead of answering faster
+HOST_CONCURRENCY = 6
+MAX_PAGES = 10
+# Budget for one whole link probe (HEAD, GET and render together), matching
+# Playwright's default navigation timeout so slow but healthy links aren't
+# reported as broken, and well inside the API server's 60s crawl deadline
+LINK_TIMEOUT_MS = 30000
+# Enough of a page for inspect_html's error and blank checks
+LINK_SNIFF_RANGE = "bytes=0-65535"
+
+# Error-page heuristic shared by every check. "not found" also covers the
+# "404 not found" and "page not found" phrasings.
+ERROR_TITLE_RE = re.compile(r"404|error", re.IGNORECASE)
+ERROR_TEXT_RE = re.compile(r"not found", re.IGNORECASE)
+
+_TITLE_RE = re.compile(r"<title[^>]*>(.*?)</title>", re.IGNORECASE | re.DOTALL)
+_HIDDEN_RE = re.compile(r"<(script|style|noscript)[^>]*>.*?</\1>", re.IGNORECASE | re.DOTALL)
+_TAG_RE = re.compile(r"<[^>]+>")
+_SPACE_RE = re.compile(r"\s+")
+
+# page.evaluate bodies can't see the patterns above, so they inline the same test
+PAGE_DATA_JS = """() => {
+    const text = document.body.textContent;
+    // Only the first 30 internal links with text are tested; stop collecting there
+    const links = [];
+    for (const a of document.querySelectorAll('a[href]')) {
+        const text = a.textContent.trim();
+        if (text && a.href.startsWith(window.location.origin)) {
+            links.push({ text, href: a.href });
+            if (links.length === 30) break;
+        }
+    }
+    return {
+        title: document.title,
+        url: window.location.href,
+        links,
+        hasContent: text.length > 100,
+        isErrorPage: /404|error/i.test(document.title) || /not found/i.test(text)
+    };
+}"""
+
+RENDERED_PAGE_JS = """() => {
+    const text = document.body.textContent;
+    return {
+        url: window.location.href,
+        isError: /404|error/i.test(document.title) || /not found/i.test(text),
+        hasContent: text.length > 100
+    };
+}"""
+
+
+class UrlStatusCache:
+    """Process-wide LRU cache of crawler link probes, keyed by normalized URL.
+
+    Entries expire after `ttl` seconds so repeat scrapes of the same site skip
+    re-probing links whose status was checked recently.
+    """
+
+    def __init__(self, ttl: float = 1800, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Return the probe for a URL, or None if it is missing or expired."""
+        entry = self._entries.get(url)
+        if entry is None:
+            return None
+        stored_at, probe = entry
+        if time.time() - stored_at > self.ttl:
+            del self._entries[url]
+            return None
+        return probe
+
+    def put(self, url: str, probe: Dict[str, Any]):
+        """Store a fresh probe, evicting the least recently stored past the cap."""
+        self._entries[url] = (time.time(), probe)
+        self._entries.move_to_end(url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class HostLimits:
+    """Per-host semaphores shared by every concurrent crawl.
+
+    A host's semaphore only exists while some crawl holds or waits on it, so
+    the table doesn't grow by one entry for every host ever crawled.
+    """
+
+    def __init__(self, limit: int = HOST_CONCURRENCY):
+        self.limit = limit
+        self._hosts: Dict[str, List] = {}  # host -> [semaphore, holders and waiters]
+
+    @asynccontextmanager
+    async def hold(self, host: str) -> AsyncIterator[None]:
+        """Hold one of the host's request slots for the duration of the block."""
+        entry = self._hosts.get(host)
+        if entry is None:
+            entry = self._hosts[host] = [asyncio.Semaphore(self.limit), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._hosts[host]
+
+
+def normalize_url(url: str) -> str:
+    """Normalize URLs consistently: origin plus path, without trailing slashes."""
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        parsed = None
+    if parsed and parsed.scheme and parsed.netloc:
+        return f"{parsed.scheme}://{parsed.netloc.lower()}{parsed.path.rstrip('/')}"
+    return url[:-1] if url.endswith("/") else url
+
+
+def inspect_html(html: str) -> Dict[str, bool]:
+    """Rough error/blank check on raw HTML for the lightweight link check."""
+    title_match = _TITLE_RE.search(html)
+    title = title_match.group(1).strip() if title_match else ""
+    text = _SPACE_RE.sub(" ", _TAG_RE.sub(" ", _HIDDEN_RE.sub(" ", html))).strip()
+    return {
+        "isError": bool(ERROR_TITLE_RE.search(title) or ERROR_TEXT_RE.search(text)),
+        "hasContent": len(text) > 100
+    }
+
+
+async def probe_link(request: APIRequestContext, href: str, probe_page: Page) -> Dict[str, Any]:
+    """Check a link destination: status via HEAD, the start of the body via GET
+    only for HTML, and a full page render only when that HTML looks broken or
+    blank (client-rendered pages need JS). All steps share LINK_TIMEOUT_MS."""
+    deadline = time.monotonic() + LINK_TIMEOUT_MS / 1000
+
+    def remaining_ms() -> float:
+        # Playwright treats a timeout of 0 as "no timeout", so never pass it
+        remaining = (deadline - time.monotonic()) * 1000
+        if remaining < 1:
+            raise PlaywrightTimeoutError(f"Link probe exceeded {LINK_TIMEOUT_MS}ms")
+        return remaining
+
+    response = await request.fetch(href, method="HEAD", max_redirects=3, timeout=remaining_ms())
+    # Some servers don't implement HEAD; fall through to GET for those
+    if response.status >= 400 and response.status not in (405, 501):
+        return {"url": response.url, "status": response.status, "isError": True, "hasContent": False}
+    # Images, PDFs and other non-HTML destinations have nothing to inspect
+    content_type = response.headers.get("content-type", "")
+    if response.status < 400 and content_type and "html" not in content_type:
+        return {"url": response.url, "status": response.status, "isError": False, "hasContent": True}
+
+    response = await request.get(href, headers={"Range": LINK_SNIFF_RANGE}, max_redirects=3, timeout=remaining_ms())
+    if response.status >= 400:
+        return {"url": response.url, "status": response.status, "isError": True, "hasContent": False}
+    inspected = inspect_html(await response.text())
+    if not inspected["isError"] and inspected["hasContent"]:
+        return {"url": response.url, "status": response.status, "isError": False, "hasContent": True}
+
+    link_response = await probe_page.goto(href, wait_until="domcontentloaded", timeout=remaining_ms())
+    rendered = await probe_page.evaluate(RENDERED_PAGE_JS)
+    return {**rendered, "status": link_response.status if link_response else 0}
+
+
+async def crawl(browser: Browser, target_url: str, url_cache: UrlStatusCache,
+                host_limits: HostLimits,
+                emit: Callable[[Dict[str, Any]], None], refresh: bool = False) -> Dict[str, Any]:
+    """Crawl a site breadth-first from `target_url`, testing every internal link.
+
+    Bugs and visited pages are reported through `emit` as they happen; link
+    probes are read from and written to `url_cache`; with `refresh` every link is
+    re-probed and only written back. Every navigation and probe
+    holds a slot `host_limits` gives for its host, so concurrent crawls
+    of one site share its budget. Cancelling the task stops the crawl and
+    closes its browser context.
+    """
+    # Each job gets its own context so concurrent jobs don't share navigation state
+    context = await browser.new_context()
+    try:
+        page = await context.new_page()
+        free_probe_pages: asyncio.Queue = asyncio.Queue()
+        for _ in range(LINK_CONCURRENCY):
+            free_probe_pages.put_nowait(await context.new_page())
+
+        start_time = time.monotonic()
+        visited_urls = set()
+        tested_links = set()  # Destination URLs already tested from some page
+        problematic_urls = set()  # URLs that are broken/blank and should never be crawled
+        reported_blank_pages = set()  # URLs we've already reported as blank destinations
+        url_queue = deque()  # FIFO of URLs to crawl; entries no longer in queued_set are skipped
+        queued_set = set()  # O(1) membership for url_queue
+        bug_count = 0
+        page_count = 0
+
+        def queue_url(url: str):
+            if url not in queued_set:
+                queued_set.add(url)
+                url_queue.append(url)
+
+        def report_bug(bug: Dict[str, Any]):
+            nonlocal bug_count
+            bug_count += 1
+            emit({"bug": bug})
+
+        def short(url: str) -> str:
+            return url.replace(target_url, "")
+
+        async def test_link(link: Dict[str, str], index: int, total: int, current_url: str):
+            logger.info("   [%d/%d] Testing link: \"%s\"", index, total, link["text"])
+            probe_page = await free_probe_pages.get()
+            try:
+                result = None if refresh else url_cache.get(link["normalizedDest"])
+                if result:
+                    logger.info("      (cached probe result)")
+                else:
+                    async with host_limits.hold(urlparse(link["href"]).netloc):
+                        result = await probe_link(context.request, link["href"], probe_page)
+                    # Only completed probes are cached; timeouts and other errors raise
+                    # past this line, so the next crawl retries those links
+                    url_cache.put(link["normalizedDest"], result)
+
+                # Check HTTP status for the link destination
+                link_status_code = result["status"]
+                normalized_result_url = normalize_url(result["url"])
+                logger.info("      -> %s (Status: %s)", short(normalized_result_url), link_status_code)
+
+                if link_status_code >= 400 or result["isError"]:
+                    report_bug({
+                        "type": "BROKEN_LINK",
+                        "page": current_url,
+                        "link": link["text"],
+                        "destination": normalized_result_url,
+                        "issue": f"Link \"{link['text']}\" leads to error page (HTTP {link_status_code})",
+                        "severity": "high",
+                        "statusCode": link_status_code
+                    })
+                    logger.info("      BROKEN LINK (HTTP %s)", link_status_code)
+                    # Mark as problematic so it won't be crawled separately
+                    problematic_urls.add(normalized_result_url)
+                    if normalized_result_url in queued_set:
+                        queued_set.discard(normalized_result_url)
+                        logger.info("      Removed from crawl queue: %s", short(normalized_result_url))
+                elif not result["hasContent"]:
+                    report_bug({
+                        "type": "BLANK_DESTINATION",
+                        "page": current_url,
+                        "link": link["text"],
+                        "destination": normalized_result_url,
+                        "issue": f"Link \"{link['text']}\" leads to blank page",
+                        "severity": "medium"
+                    })
+                    logger.info("      BLANK DESTINATION")
+                    reported_blank_pages.add(normalized_result_url)
+                    if normalized_result_url in queued_set:
+                        queued_set.discard(normalized_result_url)
+                        logger.info("      Removed from crawl queue: %s", short(normalized_result_url))
+                elif normalized_result_url not in queued_set and normalized_result_url not in problematic_urls:
+                    queue_url(normalized_result_url)
+                    logger.info("      Added to crawl queue: %s", short(normalized_result_url))
+            except Exception as link_error:
+                logger.info("      ERROR testing link: %s", link_error)
+                report_bug({
+                    "type": "NAVIGATION_ERROR",
+                    "page": current_url,
+                    "link": link["text"],
+                    "destination": link["href"],
+                    "issue": f"Failed to navigate to link: {link_error}",
+                    "severity": "medium"
+                })
+            finally:
+                free_probe_pages.put_nowait(probe_page)
+
+        async def crawl_page(current_url: str):
+            nonlocal page_count
+            normalized_current_url = normalize_url(current_url)
+            if normalized_current_url in visited_urls or page_count >= MAX_PAGES:
+                return
+
+            visited_urls.add(normalized_current_url)
+            page_count += 1
+            emit({"page": normalized_current_url})
+            logger.info("[%d] Testing: %s", page_count, short(normalized_current_url) or "/")
+
+            try:
+                # Released before the link probes below, which take their own slots
+                async with host_limits.hold(urlparse(normalized_current_url).netloc):
+                    response = await page.goto(normalized_current_url, wait_until="domcontentloaded")
+                await page.wait_for_timeout(1000)
+                page_data = await page.evaluate(PAGE_DATA_JS)
+
+                # Check HTTP status code for errors
+                status_code = response.status if response else 0
+                logger.info("   Page: \"%s\" (Status: %s)", page_data["title"], status_code)
+                logger.info("   Found %d internal links", len(page_data["links"]))
+
+                # Check for basic issues - prioritize HTTP errors
+                if status_code >= 400 or page_data["isErrorPage"]:
+                    report_bug({
+                        "type": "ERROR_PAGE",
+                        "page": normalized_current_url,
+                        "issue": f"Error page detected: {page_data['title']} (HTTP {status_code})",
+                        "severity": "high",
+                        "statusCode": status_code
+                    })
+                    logger.info("   ERROR PAGE DETECTED (HTTP %s)", status_code)
+                    return
+
+                if not page_data["hasContent"]:
+                    # Only report blank page if we haven't already reported it as a blank destination
+                    if normalized_current_url not in reported_blank_pages:
+                        report_bug({
+                            "type": "BLANK_PAGE",
+                            "page": normalized_current_url,
+                            "issue": "Page appears to be blank or has very little content",
+                            "severity": "medium"
+                        })
+                        logger.info("   LOW CONTENT WARNING")
+                    else:
+                        logger.info("   Page is blank (already reported as link destination)")
+                    return  # Don't process links from blank pages
+
+                # Test ALL links - but skip duplicates efficiently
+                links_to_test = []
+                for link in page_data["links"]:
+                    normalized_dest = normalize_url(link["href"])
+                    # Skip the page we're already on and destinations tested from earlier pages
+                    if normalized_dest == normalized_current_url or normalized_dest in tested_links:
+                        continue
+                    tested_links.add(normalized_dest)
+                    links_to_test.append({**link, "normalizedDest": normalized_dest})
+
+                # Probe the remaining links in parallel, each borrowing a free probe page
+                await asyncio.gather(*(
+                    test_link(link, i, len(links_to_test), normalized_current_url)
+                    for i, link in enumerate(links_to_test, 1)
+                ))
+            except Exception as page_error:
+                logger.info("   ERROR crawling page: %s", page_error)
+                report_bug({
+                    "type": "NAVIGATION_ERROR",
+                    "page": normalized_current_url,
+                    "issue": f"Failed to load page: {page_error}",
+                    "severity": "high"
+                })
+
+        logger.info("Starting crawl from: %s", target_url)
+        queue_url(target_url[:-1] if target_url.endswith("/") else target_url)
+
+        # Main crawling loop
+        while url_queue and page_count < MAX_PAGES:
+            current_url = url_queue.popleft()
+            if current_url not in queued_set:
+                continue  # Removed from the queue after it was added
+            queued_set.discard(current_url)
+            await crawl_page(current_url)
+
+        return {
+            "success": True,
+            "bugCount": bug_count,
+            "pagesVisited": page_count,
+            "duration": round(time.monotonic() - start_time),
+            "url": target_url
+        }
+
+    except Exception as e:
+        return {
+            "success": False,
+            "error": str(e),
+            "url": target_url
+        }
+    finally:
+        await context.close()
@@ -5,9 +5,12 @@ from dotenv import load_dotenv
 from playwright.async_api import async_playwright
 from anthropic import AsyncAnthropic
 
+import testgen
+
 # --- Configuration ---
 load_dotenv()
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
+anthropic_client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY) if ANTHROPIC_API_KEY else None
 
 # Allow URL to be passed as command line argument
 if len(sys.argv) > 1:
@@ -22,32 +25,18 @@ async def scrape_website(url: str) -> str:
     async with async_playwright() as p:
         browser = await p.chromium.launch()
         page = await browser.new_page()
+        await page.route("**/*", testgen.block_heavy_resources)
         
-        await page.goto(url, wait_until="networkidle")
-        
+        await testgen.load_page(page, url)
         html_content = await page.content()
-        
-        #js
-        scripts = await page.evaluate("""
-            () => {
-                const scripts = Array.from(document.querySelectorAll('script'));
-                return scripts.map(script => script.textContent || script.src).filter(Boolean);
-            }
-        """)
-        
-        #css
-        styles = await page.evaluate("""
-            () => {
-                const styles = Array.from(document.querySelectorAll('style'));
-                return styles.map(style => style.textContent).filter(Boolean);
-            }
-        """)
+        assets = await testgen.page_assets(page)
+        scripts, styles = assets["scripts"], assets["styles"]
         
         await browser.close()
         
         full_content = f"""
         HTML CONTENT:
-        {html_content}
+        {testgen.compact_html(html_content)}
 
         INLINE JAVASCRIPT:
         {chr(10).join(scripts) if scripts else 'No inline JavaScript found'}
@@ -63,14 +52,12 @@ async def generate_playwright_test(html_content: str, url: str) -> str:
     """Generate a complete Playwright test file using Claude."""
     print("🤖 Generating Playwright test with Claude...")
     
-    client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
-    
     prompt = f"""
 You are a QA engineer. I have scraped the HTML, JavaScript, and CSS from this website: {url}
 
 Here is the complete frontend code:
 
-{html_content[:30000]}  # Limit to avoid token limits
+{html_content[:testgen.HTML_PROMPT_CHARS]}
 
 Generate a COMPLETE Playwright test file (Python) that tests this website thoroughly. The test should:
 
@@ -79,6 +66,7 @@ Generate a COMPLETE Playwright test file (Python) that tests this website thorou
 3. Test forms and user interactions
 4. Test responsive design elements
 5. Include proper assertions and error handling
+6. Rely on Playwright's auto-waiting locators and expect() assertions instead of wait_for_load_state("networkidle") or fixed sleeps
 
 Return ONLY the complete Python Playwright test code, no explanations. The name of the test file should be the same as the playwright test function name. Make sure to call the test function so that the code is ready to run.
 For example, if the test function is called test_google_com, this is what the end of the test file should look like, so that the test file can be run:
@@ -94,18 +82,11 @@ if __name__ == "__main__":
         finally:
             browser.close()
 
-The test file should be named `test_{url.replace("https://", "").replace("http://", "").replace("/", "_").replace(".", "_")}.py`
+The test file should be named `test_{testgen.safe_name(url)}.py`
 """
 
     try:
-        response = await client.messages.create(
-            model="claude-3-5-sonnet-20240620",
-            max_tokens=4000,
-            system="You are a QA engineer that generates complete, runnable Playwright test files. Return only the Python code, no explanations.",
-            messages=[{"role": "user", "content": prompt}]
-        )
-        
-        test_code = response.content[0].text
+        test_code = await testgen.stream_test_code(anthropic_client, prompt)
         print("✅ Test generation complete!")
         return test_code
         
@@ -117,7 +98,7 @@ async def save_test_file(test_code: str, url: str):
     """Save the generated test to a file."""
     print(f"💾 Saving test to file: {test_code}")
     # Create a safe filename
-    filename = f"test_{url.replace('https://', '').replace('http://', '').replace('/', '_').replace('.', '_').replace(':', '_')}.py"
+    filename = f"test_{testgen.safe_name(url)}.py"
     
     with open(filename, 'w', encoding='utf-8') as f:
         f.write(test_code)
@@ -135,20 +116,32 @@ async def generate_playwright_config(func_name: str):
     Return ONLY the complete Python Playwright config code, no explanations. The code should be ready to run.
     """
     print(f"🤖 Generating Playwright config with Claude...")
-    client = AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
 
     try:
-        response = await client.messages.create(
-            model="claude-3-5-sonnet-20240620",
-            max_tokens=4000,
-            system="You are a QA engineer that generates complete, runnable Playwright config files. Return only the Python code, no explanations.",
-            messages=[{"role": "user", "content": prompt}]
-        )
-
-        config_code = response.content[0].text
+        # Write the config as it streams in, then swap it into place
+        chunks = []
+        try:
+            with open("playwright.config.py.part", "w", encoding='utf-8') as f:
+                async with anthropic_client.messages.stream(
+                    model=testgen.TEST_MODEL,
+                    max_tokens=4000,
+                    system="You are a QA engineer that generates complete, runnable Playwright config files. Return only the Python code, no explanations.",
+                    messages=[{"role": "user", "content": prompt}]
+                ) as stream:
+                    async for text in stream.text_stream:
+                        chunks.append(text)
+                        f.write(text)
+            os.replace("playwright.config.py.part", "playwright.config.py")
+        except BaseException:
+            # Don't leave a half-written config behind when streaming or writing fails
+            try:
+                os.remove("playwright.config.py.part")
+            except FileNotFoundError:
+                pass
+            raise
+
+        config_code = "".join(chunks)
         print("✅ Config generation complete!")
-        with open("playwright.config.py", "w", encoding='utf-8') as f:
-            f.write(config_code)
         return config_code
         
     except Exception as e:
@@ -170,8 +163,6 @@ async def main():
     
     # 2. Generate Playwright test
     test_code = await generate_playwright_test(html_content, TARGET_URL)
-    test_code = test_code.split("```python")[1]
-    test_code = test_code.split("```")[0]
     
     if not test_code:
         print("❌ Failed to generate test code.")
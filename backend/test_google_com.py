@@ -1,47 +1,69 @@
 
-from playwright.sync_api import Playwright, sync_playwright, expect
+from playwright.sync_api import Playwright, sync_playwright, expect, TimeoutError as PlaywrightTimeoutError
+
+SEARCH_BOX = "input[name='q']"
+
+# Static homepage elements, checked in one polled page function instead of one round trip each
+HOMEPAGE_SELECTORS = [
+    "img[alt='Google']",
+    "input[name='btnI']",
+    "div[aria-label='Search by voice']",
+]
+HOMEPAGE_TEXTS = [
+    "Gmail",
+    "Images",
+    "Google offered in:",
+    "About",
+    "Advertising",
+    "Business",
+    "How Search works",
+]
+FIND_HIDDEN_JS = """
+([selectors, texts]) => {
+    // Same notion of visible as Playwright: non-empty box and not visibility:hidden
+    const isVisible = (selector) => {
+        const el = document.querySelector(selector);
+        if (!el) return false;
+        if (el.checkVisibility) return el.checkVisibility({ visibilityProperty: true });
+        return el.getClientRects().length > 0 && getComputedStyle(el).visibility !== "hidden";
+    };
+    const renderedText = document.body.innerText;
+    return [
+        ...selectors.filter((selector) => !isVisible(selector)),
+        ...texts.filter((text) => !renderedText.includes(text)),
+    ];
+}
+"""
+ALL_VISIBLE_JS = f"(args) => ({FIND_HIDDEN_JS})(args).length === 0"
+EXPECT_TIMEOUT_MS = 5000  # matches expect()'s default
 
 def test_google_com(page):
     # Test page loading and basic elements
     page.goto("https://www.google.com")
     expect(page).to_have_title("Google")
-    expect(page.locator("img[alt='Google']")).to_be_visible()
     
     # Test search functionality
-    search_box = page.locator("input[name='q']")
+    search_box = page.locator(SEARCH_BOX)
     expect(search_box).to_be_visible()
     search_box.fill("Playwright")
     search_box.press("Enter")
     expect(page).to_have_title("Playwright - Google Search")
     
-    # Test navigation and links
+    # Test navigation links, "I'm Feeling Lucky", voice search, language options and footer links
     page.goto("https://www.google.com")
-    expect(page.locator("text=Gmail")).to_be_visible()
-    expect(page.locator("text=Images")).to_be_visible()
-    
-    # Test "I'm Feeling Lucky" button
-    lucky_button = page.locator("input[name='btnI']")
-    expect(lucky_button).to_be_visible()
-    
-    # Test language options
-    language_link = page.locator("text=Google offered in:")
-    expect(language_link).to_be_visible()
-    
-    # Test footer links
-    expect(page.locator("text=About")).to_be_visible()
-    expect(page.locator("text=Advertising")).to_be_visible()
-    expect(page.locator("text=Business")).to_be_visible()
-    expect(page.locator("text=How Search works")).to_be_visible()
+    expect(search_box).to_be_visible()
+    # Poll like expect() does, so late-rendering elements aren't reported as missing
+    try:
+        page.wait_for_function(ALL_VISIBLE_JS, arg=[HOMEPAGE_SELECTORS, HOMEPAGE_TEXTS], timeout=EXPECT_TIMEOUT_MS)
+    except PlaywrightTimeoutError:
+        hidden = page.evaluate(FIND_HIDDEN_JS, [HOMEPAGE_SELECTORS, HOMEPAGE_TEXTS])
+        raise AssertionError(f"Not visible on the homepage: {hidden}") from None
     
     # Test responsive design
     page.set_viewport_size({"width": 1920, "height": 1080})
-    expect(page.locator("input[name='q']")).to_be_visible()
+    expect(search_box).to_be_visible()
     page.set_viewport_size({"width": 375, "height": 667})
-    expect(page.locator("input[name='q']")).to_be_visible()
-    
-    # Test voice search button
-    voice_search = page.locator("div[aria-label='Search by voice']")
-    expect(voice_search).to_be_visible()
+    expect(search_box).to_be_visible()
     
     # Test settings menu
     settings_button = page.locator("text=Settings")
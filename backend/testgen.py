@@ -0,0 +1,92 @@
+"""
+Scraping and Claude test-generation helpers shared by fastmcp_server.py and generate_tests.py.
+"""
+
+import re
+from typing import Dict, List
+
+from anthropic import AsyncAnthropic
+from playwright.async_api import Page, Route, TimeoutError as PlaywrightTimeoutError
+
+NETWORKIDLE_TIMEOUT_MS = 2000  # cap on waiting for late XHR after DOMContentLoaded
+HTML_PROMPT_CHARS = 30000  # Limit to avoid token limits
+# Scraping only reads the DOM and inline <script>/<style>, so skip fetching these
+BLOCKED_RESOURCE_TYPES = frozenset({"image", "media", "font", "stylesheet"})
+
+TEST_MODEL = "claude-3-5-sonnet-20240620"
+TEST_SYSTEM = "You are a QA engineer that generates complete, runnable Playwright test files. Return only the Python code, no explanations."
+
+_URL_SCHEME = re.compile(r"https?://")
+_URL_UNSAFE = str.maketrans("/.:", "___")
+_HTML_NOISE = re.compile(r"<script\b.*?</script>|<style\b.*?</style>|<!--.*?-->", re.S | re.I)
+_WHITESPACE_RUN = re.compile(r"\s{2,}")
+
+# Inline JavaScript and CSS, collected in one DOM pass
+PAGE_ASSETS_JS = """
+    () => ({
+        scripts: Array.from(document.querySelectorAll('script'), script => script.textContent || script.src).filter(Boolean),
+        styles: Array.from(document.querySelectorAll('style'), style => style.textContent).filter(Boolean)
+    })
+"""
+
+
+def safe_name(url: str) -> str:
+    """Turn a URL into the identifier used for its test file and function.
+
+    Trailing underscores are kept so existing files like test_localhost_3001_.py keep their names.
+    """
+    return _URL_SCHEME.sub("", url).translate(_URL_UNSAFE)
+
+
+def compact_html(html: str) -> str:
+    """Drop scripts, styles, comments and whitespace runs that carry no selectors."""
+    return _WHITESPACE_RUN.sub(" ", _HTML_NOISE.sub("", html))
+
+
+async def block_heavy_resources(route: Route):
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def load_page(page: Page, url: str):
+    """Navigate for scraping: DOMContentLoaded plus a short networkidle window."""
+    await page.goto(url, wait_until="domcontentloaded", timeout=15000)
+    try:
+        # Give client-side rendering a short window without waiting on analytics beacons
+        await page.wait_for_load_state("networkidle", timeout=NETWORKIDLE_TIMEOUT_MS)
+    except PlaywrightTimeoutError:
+        pass
+
+
+async def page_assets(page: Page) -> Dict[str, List[str]]:
+    """Inline scripts (or their src) and styles of the loaded page."""
+    return await page.evaluate(PAGE_ASSETS_JS)
+
+
+def strip_code_fence(code: str) -> str:
+    """Return the code inside a ```python fence, or the text unchanged if there is none."""
+    _, fence, rest = code.partition("```python")
+    if fence:
+        code, _, _ = rest.partition("```")
+    return code
+
+
+async def stream_test_code(client: AsyncAnthropic, prompt: str) -> str:
+    """Stream a generated test file from Claude and return just its code."""
+    chunks = []
+    async with client.messages.stream(
+        model=TEST_MODEL,
+        max_tokens=4000,
+        system=TEST_SYSTEM,
+        # Open the code fence for Claude and stop at its closing fence, so no prose or markdown follows the code
+        messages=[
+            {"role": "user", "content": prompt},
+            {"role": "assistant", "content": "```python"}
+        ],
+        stop_sequences=["```"]
+    ) as stream:
+        async for text in stream.text_stream:
+            chunks.append(text)
+    return strip_code_fence("".join(chunks))